@@ -0,0 +1,50 @@
+"""
+Benchmark serial vs. process-pool trip aggregation.
+
+    python bench_trip_stats.py [samples] [max_workers]
+
+Run it on the target host before setting TRIP_STATS_WORKERS > 1: the pool
+only pays off when the speedup column is clearly above 1.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from llm import telemetry  # noqa: E402
+from test_trip_stats import generate_trip  # noqa: E402
+
+
+def timed(fn, repeat: int = 3):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    trip = generate_trip(samples, missing_ratio=0.0)
+    print(f"{samples} samples, {os.cpu_count()} CPUs")
+
+    serial_time, serial = timed(lambda: telemetry.aggregate_trip(trip, parallel=False))
+    print(f"serial               {serial_time:6.2f}s")
+
+    for workers in sorted({1, 2, 4, 8, max_workers}):
+        if workers > max_workers:
+            continue
+        telemetry.shutdown_pool()
+        telemetry.WORKERS = workers
+        telemetry.aggregate_trip(trip[:10_000], parallel=True)  # start the workers
+        elapsed, result = timed(lambda: telemetry.aggregate_trip(trip, parallel=True))
+        assert result == serial, "parallel result differs from serial"
+        print(f"pool, {workers:2d} workers     {elapsed:6.2f}s   speedup {serial_time / elapsed:4.2f}x")
+    telemetry.shutdown_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1,3 @@
 from .analyze import *
-from .ingest import *
\ No newline at end of file
+from .ingest import *
+from .status import *
\ No newline at end of file
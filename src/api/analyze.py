@@ -1,70 +1,161 @@
-from fastapi import APIRouter, HTTPException
-from sqlalchemy import select
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
 import json
 
 from database import Session
+from database.archive import fetch_trip, trip_vehicle, trip_version
 from database.tables.reports import Report
-from database.tables.telemetry import TelemetryData
+from llm.telemetry import aggregate_trip, compute_trip_stats
 from schemas import ReportResponse
 from schemas.models import TripAnalysis
-from utils.chatgpt import analyze_trip_with_chatgpt
+from utils.admission import ANALYZE, admission_dependency, admission_slot, check_vehicle_rate
+from utils.chatgpt import analyze_trip_with_chatgpt, stream_trip_analysis_with_chatgpt
+from utils.etag import etag_matches, make_etag, not_modified, set_etag
 
 
 router = APIRouter()
 
 
+def _report_row(vehicle_id: str, report: TripAnalysis) -> Report:
+    return Report(
+        vehicle_id=vehicle_id,
+        score=report.eco_score,
+        analysis=json.dumps(report.model_dump())
+    )
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str, ensure_ascii=False)}\n\n"
+
+
 @router.get("/analyze/{trip_id}", response_model=TripAnalysis)
 async def analyze_trip(
         trip_id: str,
+        request: Request,
+        response: Response,
+        if_none_match: Optional[str] = Header(None),
 ):
     async with Session() as session:
-        stmt = select(TelemetryData).where(TelemetryData.trip_id == trip_id)
-        result = await session.execute(stmt)
-        trip_data = result.scalars().all()
-        print(trip_data[0].vehicle_id)
-        if not trip_data:
+        # Row count and latest timestamp come from the (trip_id, timestamp)
+        # index and the archive manifest, so a matching poll never reads the
+        # rows or calls the LLM.
+        count, last_ts = await trip_version(session, trip_id)
+        if not count:
             raise HTTPException(status_code=404, detail="Trip data not found")
 
-        trip_data_dict = [
-            {
-                "vehicle_id": item.vehicle_id,
-                "trip_id": item.trip_id,
-                "speed": item.speed,
-                "rpm": item.rpm,
-                "engine_temp": item.engine_temp,
-                "fuel_consumption": item.fuel_consumption,
-                "timestamp": item.timestamp,
-            }
-            for item in trip_data
-        ]
-
-        report = analyze_trip_with_chatgpt(trip_data_dict)
+        etag = make_etag("trip", trip_id, count, last_ts.isoformat())
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
+        vehicle_id = await trip_vehicle(session, trip_id)
+    check_vehicle_rate(vehicle_id)
+
+    # Only a full analysis is admission-controlled, so conditional polls never
+    # spend a client token or queue behind LLM calls. No session stays open
+    # across the LLM call, so a slow model never pins a pooled connection.
+    async with admission_slot(ANALYZE, request):
+        async with Session() as session:
+            trip_data = await fetch_trip(session, trip_id)
+
+        report = await run_in_threadpool(analyze_trip_with_chatgpt, trip_data)
         if not report:
             raise HTTPException(status_code=500, detail="Failed to analyze trip data")
 
-        db_report = Report(
-            vehicle_id=trip_data[0].vehicle_id,
-            score=report.eco_score,
-            analysis=json.dumps(report.model_dump())
-        )
-        session.add(db_report)
-        await session.commit()
+        async with Session() as session:
+            session.add(_report_row(vehicle_id, report))
+            await session.commit()
+
+    set_etag(response, etag)
+    return report
+
+
+async def _analysis_events(vehicle_id: str, trip_data: List[Dict[str, Any]]) -> AsyncIterator[str]:
+    # The response has already started, so every failure is reported as an
+    # `error` event rather than an HTTP status.
+    try:
+        agg = await run_in_threadpool(aggregate_trip, trip_data)
+        stats = compute_trip_stats(trip_data, agg)
+    except Exception as e:
+        yield _sse("error", {"detail": f"Failed to compute trip statistics: {e}"})
+        return
+    yield _sse("stats", stats)
+
+    report: Optional[TripAnalysis] = None
+    try:
+        events = stream_trip_analysis_with_chatgpt(trip_data, agg=agg)
+        async for event, data in iterate_in_threadpool(events):
+            if event == "analysis":
+                report = data
+            else:
+                yield _sse(event, data)
+        if report is None:
+            raise RuntimeError("the model returned no analysis")
+    except Exception as e:
+        yield _sse("error", {"detail": f"Failed to analyze trip data: {e}"})
+        return
 
-        return report
+    try:
+        async with Session() as session:
+            db_report = _report_row(vehicle_id, report)
+            session.add(db_report)
+            await session.commit()
+    except Exception as e:
+        yield _sse("error", {"detail": f"Failed to save the report: {e}"})
+        return
+
+    yield _sse("analysis", {"report_id": str(db_report.id), "analysis": report.model_dump()})
+
+
+@router.get("/analyze/{trip_id}/stream", dependencies=[Depends(admission_dependency(ANALYZE))])
+async def stream_trip_analysis(
+        trip_id: str,
+):
+    """
+    Server-sent events: `stats` with the locally computed statistics and
+    critical events, then `summary`, `suggestions` and `general_advice`
+    fragments as the model produces them, and finally `analysis` with the
+    validated TripAnalysis and the stored report id (or `error`).
+    """
+    async with Session() as session:
+        vehicle_id = await trip_vehicle(session, trip_id)
+        if vehicle_id is None:
+            raise HTTPException(status_code=404, detail="Trip data not found")
+        check_vehicle_rate(vehicle_id)
+        trip_data = await fetch_trip(session, trip_id)
+
+    return StreamingResponse(
+        _analysis_events(vehicle_id, trip_data),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get("/reports/{vehicle_id}", response_model=list[ReportResponse])
 async def get_reports(
         vehicle_id: str,
+        response: Response,
+        if_none_match: Optional[str] = Header(None),
 ):
     async with Session() as session:
+        stmt = (select(func.count(), func.max(Report.date))
+                .where(Report.vehicle_id == vehicle_id))
+        count, last_date = (await session.execute(stmt)).one()
+        if not count:
+            raise HTTPException(status_code=404, detail="No reports found for this vehicle")
+
+        etag = make_etag("reports", vehicle_id, count, last_date.isoformat())
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
         stmt = select(Report).where(Report.vehicle_id == vehicle_id)
         result = await session.execute(stmt)
         reports = result.scalars().all()
 
-        if not reports:
-            raise HTTPException(status_code=404, detail="No reports found for this vehicle")
-
+        set_etag(response, etag)
         return [ReportResponse(
             vehicle_id=report.vehicle_id,
             score=report.score,
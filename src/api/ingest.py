@@ -1,16 +1,17 @@
 from typing import List
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 
 from database import Session
+from database.tables.telemetry import TelemetryData
 from schemas.models import TelemetryDataResponse
-from . import TelemetryData
+from utils.admission import INGEST, admission_dependency
 
 
 router = APIRouter()
 
 
-@router.post("/ingest")
+@router.post("/ingest", dependencies=[Depends(admission_dependency(INGEST))])
 async def ingest_telemetry_data(
         data: List[TelemetryDataResponse]
 ):
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, HTTPException
+
+from database.engine import is_ready
+from utils.admission import admission_stats
+
+
+router = APIRouter()
+
+
+@router.get("/status/admission")
+async def get_admission_status():
+    return admission_stats()
+
+
+@router.get("/status/ready")
+async def get_readiness():
+    if not is_ready():
+        raise HTTPException(status_code=503, detail="Connection pool is warming up")
+    return {"status": "ready"}
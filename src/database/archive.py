@@ -0,0 +1,250 @@
+import asyncio
+import heapq
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+from urllib.parse import quote
+
+from sqlalchemy import delete, func, select
+from starlette.concurrency import run_in_threadpool
+
+from database import Session
+from database.engine import _find_project_root
+from database.tables.archive import ArchivedTrip
+from database.tables.telemetry import TelemetryData
+
+
+# Relative paths are anchored at the project root (the directory holding
+# .env, else the repository root), so the API and the CLI job agree on it
+# whatever their working directory.
+_PROJECT_ROOT = _find_project_root() or Path(__file__).resolve().parents[2]
+ARCHIVE_DIR = _PROJECT_ROOT / os.getenv("TELEMETRY_ARCHIVE_DIR", "archive")
+ARCHIVE_AFTER = timedelta(days=float(os.getenv("TELEMETRY_ARCHIVE_AFTER_DAYS", 28)))
+ARCHIVE_BATCH = int(os.getenv("TELEMETRY_ARCHIVE_BATCH", 100))
+
+READ_COLUMNS = ["timestamp", "rpm", "speed", "fuel_consumption", "engine_temp"]
+
+
+def _trip_path(vehicle_id: str, trip_id: str, started_at: datetime, version: datetime) -> str:
+    """
+    Archive path relative to ARCHIVE_DIR, partitioned by vehicle and month.
+    Each archival run writes a new version so the file the manifest points
+    at is never modified in place.
+    """
+    return (f"vehicle_id={quote(vehicle_id, safe='')}/month={started_at:%Y-%m}/"
+            f"{quote(trip_id, safe='')}.{version:%Y%m%d%H%M%S%f}.parquet")
+
+
+def _schema():
+    """
+    Columns stored per file. vehicle_id and trip_id are constant per trip and
+    live in the manifest instead. pyarrow is imported on first use to keep
+    it off the startup path.
+    """
+    import pyarrow as pa
+    return pa.schema([
+        ("id", pa.string()),
+        ("timestamp", pa.timestamp("us")),
+        ("rpm", pa.int32()),
+        ("speed", pa.float64()),
+        ("fuel_consumption", pa.float64()),
+        ("engine_temp", pa.float64()),
+    ])
+
+
+def _fsync_dir(path: Path) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _write_trip_file(path: str, rows: List[Dict[str, Any]]) -> None:
+    """
+    Write a trip file durably: once this returns, the file survives a crash,
+    so the rows it holds can be deleted from telemetry_data.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    target = ARCHIVE_DIR / path
+    target.parent.mkdir(parents=True, exist_ok=True)
+    schema = _schema()
+    columns = {name: [row[name] for row in rows] for name in schema.names}
+    columns["id"] = [str(v) for v in columns["id"]]
+    table = pa.Table.from_pydict(columns, schema=schema)
+    tmp = target.with_suffix(".parquet.tmp")
+    pq.write_table(table, tmp, compression="zstd")
+    with open(tmp, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp, target)
+    # Persist the rename and any partition directories just created.
+    directory = target.parent
+    while True:
+        _fsync_dir(directory)
+        if directory == ARCHIVE_DIR or directory == directory.parent:
+            break
+        directory = directory.parent
+
+
+def read_archived_trip(archived: ArchivedTrip, columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Read an archived trip back as telemetry rows, memory-mapping the file and
+    loading only the requested columns.
+    """
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(ARCHIVE_DIR / archived.path, columns=columns or READ_COLUMNS, memory_map=True)
+    rows = table.to_pylist()
+    for row in rows:
+        row["vehicle_id"] = archived.vehicle_id
+        row["trip_id"] = archived.trip_id
+    return rows
+
+
+def _by_timestamp(row: Dict[str, Any]) -> datetime:
+    return row["timestamp"]
+
+
+async def trip_version(session, trip_id: str) -> Tuple[int, Optional[datetime]]:
+    """
+    Row count and latest timestamp of a trip across the hot table and the
+    archive. Only touches the (trip_id, timestamp) index and the manifest.
+    """
+    stmt = (select(func.count(), func.max(TelemetryData.timestamp))
+            .where(TelemetryData.trip_id == trip_id))
+    count, last_ts = (await session.execute(stmt)).one()
+    archived = await session.get(ArchivedTrip, trip_id)
+    if archived:
+        count += archived.row_count
+        last_ts = max(last_ts, archived.ended_at) if last_ts else archived.ended_at
+    return count, last_ts
+
+
+async def trip_vehicle(session, trip_id: str) -> Optional[str]:
+    stmt = select(TelemetryData.vehicle_id).where(TelemetryData.trip_id == trip_id).limit(1)
+    vehicle_id = (await session.execute(stmt)).scalar_one_or_none()
+    if vehicle_id is None:
+        archived = await session.get(ArchivedTrip, trip_id)
+        vehicle_id = archived.vehicle_id if archived else None
+    return vehicle_id
+
+
+async def fetch_trip(session, trip_id: str, *, with_ids: bool = False) -> List[Mapping[str, Any]]:
+    """
+    All samples of a trip ordered by timestamp, reading the archived part
+    transparently when the trip has been tiered out of telemetry_data.
+    Sample ids are only selected when `with_ids` is set.
+
+    The archiver moves rows and updates the manifest in one transaction, so
+    the hot rows are consistent with the manifest entry read before them as
+    long as that entry is unchanged afterwards. Otherwise (or when the file
+    was superseded and removed meanwhile) the read starts over.
+    """
+    columns = [
+        TelemetryData.vehicle_id,
+        TelemetryData.trip_id,
+        TelemetryData.timestamp,
+        TelemetryData.rpm,
+        TelemetryData.speed,
+        TelemetryData.fuel_consumption,
+        TelemetryData.engine_temp,
+    ]
+    if with_ids:
+        columns.insert(0, TelemetryData.id)
+    stmt = (select(*columns)
+            .where(TelemetryData.trip_id == trip_id)
+            .order_by(TelemetryData.timestamp))
+    cold_columns = ["id"] + READ_COLUMNS if with_ids else READ_COLUMNS
+
+    while True:
+        archived = await session.get(ArchivedTrip, trip_id, populate_existing=True)
+        path = archived.path if archived else None
+        hot = (await session.execute(stmt)).mappings().all()
+        archived = await session.get(ArchivedTrip, trip_id, populate_existing=True)
+        if (archived.path if archived else None) != path:
+            continue
+        if not archived:
+            return hot
+        try:
+            cold = await run_in_threadpool(read_archived_trip, archived, cold_columns)
+        except FileNotFoundError:
+            # Superseded and removed since the manifest was read: reload it.
+            # A file missing from an unchanged entry is a real loss.
+            archived = await session.get(ArchivedTrip, trip_id, populate_existing=True)
+            if archived is not None and archived.path == path:
+                raise
+            continue
+        if not hot:
+            return cold
+        return list(heapq.merge(cold, hot, key=_by_timestamp))
+
+
+async def _archive_trip(trip_id: str, cutoff: datetime) -> bool:
+    async with Session() as session:
+        archived = await session.get(ArchivedTrip, trip_id)
+        rows = await fetch_trip(session, trip_id, with_ids=True)
+        hot_count = len(rows) - (archived.row_count if archived else 0)
+        if not hot_count or rows[-1]["timestamp"] >= cutoff:
+            return False
+
+        now = datetime.now()
+        path = _trip_path(rows[0]["vehicle_id"], trip_id, rows[0]["timestamp"], now)
+        await run_in_threadpool(_write_trip_file, path, rows)
+
+        result = await session.execute(
+            delete(TelemetryData).where(
+                TelemetryData.trip_id == trip_id,
+                TelemetryData.timestamp <= rows[-1]["timestamp"],
+            )
+        )
+        if result.rowcount != hot_count:
+            # Samples arrived while we were writing; retry on the next run.
+            await session.rollback()
+            (ARCHIVE_DIR / path).unlink(missing_ok=True)
+            return False
+
+        previous = archived.path if archived else None
+        if not archived:
+            archived = ArchivedTrip(trip_id=trip_id, vehicle_id=rows[0]["vehicle_id"])
+            session.add(archived)
+        archived.path = path
+        archived.row_count = len(rows)
+        archived.started_at = rows[0]["timestamp"]
+        archived.ended_at = rows[-1]["timestamp"]
+        archived.archived_at = now
+        await session.commit()
+
+        # Readers that still hold the previous entry reload the manifest
+        # when they find its file gone (see fetch_trip).
+        if previous:
+            (ARCHIVE_DIR / previous).unlink(missing_ok=True)
+        return True
+
+
+async def archive_cold_trips(older_than: timedelta = ARCHIVE_AFTER, limit: int = ARCHIVE_BATCH) -> int:
+    """
+    Move trips whose last sample is older than `older_than` out of
+    telemetry_data into the archive. Returns the number of trips moved.
+    Whole trips are loaded in memory, so this runs as a separate job
+    (`python -m database.archive`), never inside the API process.
+    """
+    cutoff = datetime.now() - older_than
+    async with Session() as session:
+        stmt = (select(TelemetryData.trip_id)
+                .group_by(TelemetryData.trip_id)
+                .having(func.max(TelemetryData.timestamp) < cutoff)
+                .limit(limit))
+        trip_ids = (await session.execute(stmt)).scalars().all()
+
+    moved = 0
+    for trip_id in trip_ids:
+        if await _archive_trip(trip_id, cutoff):
+            moved += 1
+    return moved
+
+
+if __name__ == "__main__":
+    print(f"Archived {asyncio.run(archive_cold_trips())} cold trips")
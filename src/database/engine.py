@@ -1,13 +1,16 @@
+import asyncio
 import os
 from pathlib import Path
 from typing import Optional
 
-from sqlalchemy import NullPool
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import async_sessionmaker
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
 from sqlalchemy.ext.asyncio.session import AsyncSession
 from sqlalchemy.orm import declarative_base
 
+from .migrations import migrate
+
 
 def _find_project_root() -> Optional[Path]:
     """
@@ -70,8 +73,8 @@ def _create_engine_and_session() -> tuple[AsyncEngine, async_sessionmaker[AsyncS
 
     engine = create_async_engine(
         db_url,
-        pool_size=10,
-        max_overflow=20,
+        pool_size=int(os.getenv("DB_POOL_SIZE", 10)),
+        max_overflow=int(os.getenv("DB_POOL_MAX_OVERFLOW", 20)),
         echo=False,
         future=True,
     )
@@ -87,16 +90,46 @@ Base = declarative_base()
 Engine, Session = _create_engine_and_session()
 
 
+_pool_warm = False
+
+
 async def init_db() -> None:
     """
-    Initialize the database connection.
-    Configuration will be loaded from:
-    1. .env file in project root
-    2. Environment variables
+    Bring the schema up to date by applying pending migrations.
+    Existing data is left untouched.
     """
-    global Engine, Session
-    Engine, Session = _create_engine_and_session()
+    applied = await migrate(Engine)
+    if applied:
+        print(f"Applied schema migrations: {applied}")
 
-    async with Engine.begin() as conn:
-        await conn.run_sync(Base.metadata.drop_all)
-        await conn.run_sync(Base.metadata.create_all)
+
+async def warm_pool(retry_delay: float = 1.0) -> None:
+    """
+    Open DB_POOL_WARM_SIZE pool connections (default: the whole pool) up
+    front so the first requests after a restart do not pay connection
+    setup. Retries until it succeeds.
+    """
+    global _pool_warm
+    pool_size = Engine.pool.size()
+    size = min(int(os.getenv("DB_POOL_WARM_SIZE", pool_size)), pool_size)
+    while True:
+        results = await asyncio.gather(*(Engine.connect() for _ in range(size)), return_exceptions=True)
+        conns = [r for r in results if not isinstance(r, BaseException)]
+        errors = [r for r in results if isinstance(r, BaseException)]
+        try:
+            if not errors:
+                await asyncio.gather(*(conn.execute(text("SELECT 1")) for conn in conns))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            for conn in conns:
+                await conn.close()
+        if not errors:
+            break
+        print(f"Failed to warm connection pool: {errors[0]}")
+        await asyncio.sleep(retry_delay)
+    _pool_warm = True
+
+
+def is_ready() -> bool:
+    return _pool_warm
@@ -0,0 +1,80 @@
+from typing import List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+# Arbitrary key for pg_advisory_xact_lock, so that instances booting at the
+# same time during a rolling restart apply migrations one at a time.
+_LOCK_KEY = 7_340_411
+
+# (version, description, statements). Append new migrations at the end and
+# never edit one that has shipped.
+MIGRATIONS: List[Tuple[int, str, List[str]]] = [
+    (1, "initial schema", [
+        """
+        CREATE TABLE IF NOT EXISTS telemetry_data (
+            id UUID PRIMARY KEY,
+            vehicle_id VARCHAR NOT NULL,
+            trip_id VARCHAR NOT NULL,
+            timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            rpm INTEGER,
+            speed FLOAT,
+            fuel_consumption FLOAT,
+            engine_temp FLOAT
+        )
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS ix_telemetry_data_trip_id_timestamp
+            ON telemetry_data (trip_id, timestamp)
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS reports (
+            id UUID PRIMARY KEY,
+            vehicle_id VARCHAR NOT NULL,
+            score INTEGER NOT NULL,
+            date DATE NOT NULL,
+            analysis JSON
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_reports_vehicle_id ON reports (vehicle_id)",
+        """
+        CREATE TABLE IF NOT EXISTS archived_trips (
+            trip_id VARCHAR PRIMARY KEY,
+            vehicle_id VARCHAR NOT NULL,
+            path VARCHAR NOT NULL,
+            row_count INTEGER NOT NULL,
+            started_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            ended_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            archived_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_archived_trips_vehicle_id ON archived_trips (vehicle_id)",
+    ]),
+]
+
+
+async def migrate(engine: AsyncEngine) -> List[int]:
+    """
+    Apply pending migrations in a single transaction and return the versions
+    applied. A no-op boot costs one lock and one small query.
+    """
+    async with engine.begin() as conn:
+        await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _LOCK_KEY})
+        await conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_version ("
+            " version INTEGER PRIMARY KEY,"
+            " description VARCHAR NOT NULL,"
+            " applied_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now())"
+        ))
+        applied = set((await conn.execute(text("SELECT version FROM schema_version"))).scalars())
+
+        pending = [m for m in MIGRATIONS if m[0] not in applied]
+        for version, description, statements in pending:
+            for statement in statements:
+                await conn.execute(text(statement))
+            await conn.execute(
+                text("INSERT INTO schema_version (version, description) VALUES (:version, :description)"),
+                {"version": version, "description": description},
+            )
+    return [m[0] for m in pending]
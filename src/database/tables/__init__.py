@@ -1 +1,2 @@
+from .archive import *
 from .telemetry import *
\ No newline at end of file
@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from sqlalchemy import Column, String, DateTime, Integer
+
+from database.engine import Base
+
+
+class ArchivedTrip(Base):
+    """
+    Manifest entry for a trip moved out of telemetry_data into a columnar
+    file under the archive directory.
+    """
+    __tablename__ = "archived_trips"
+
+    trip_id = Column(String, primary_key=True)
+    vehicle_id = Column(String, nullable=False, index=True)
+    path = Column(String, nullable=False)
+    row_count = Column(Integer, nullable=False)
+    started_at = Column(DateTime, nullable=False)
+    ended_at = Column(DateTime, nullable=False)
+    archived_at = Column(DateTime, default=datetime.now, nullable=False)
@@ -10,7 +10,7 @@ class Report(Base):
     __tablename__ = 'reports'
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    vehicle_id = Column(String, nullable=False)
+    vehicle_id = Column(String, nullable=False, index=True)
     score = Column(Integer, nullable=False)
     date = Column(Date, default=date.today, nullable=False)
     analysis = Column(JSON, nullable=True)
@@ -1,12 +1,15 @@
 import uuid
 
-from sqlalchemy import Column, String, DateTime, Integer, Float, UUID
+from sqlalchemy import Column, String, DateTime, Integer, Float, UUID, Index
 
 from database.engine import Base
 
 
 class TelemetryData(Base):
     __tablename__ = "telemetry_data"
+    __table_args__ = (
+        Index("ix_telemetry_data_trip_id_timestamp", "trip_id", "timestamp"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     vehicle_id = Column(String, nullable=False)
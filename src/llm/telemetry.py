@@ -1,41 +1,253 @@
-import statistics
+import math
+import multiprocessing
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from fractions import Fraction
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 
-def detect_peaks(data, key: str, threshold: float):
-    peaks, prev = [], data[0].get(key)
-    for pt in data[1:]:
-        cur = pt.get(key)
+MEAN_KEYS = ("speed", "engine_temp", "fuel_consumption")
+PEAK_METRICS = [
+    ("rpm", 1000, "RPM"),
+    ("fuel_consumption", 2.0, "L/100km"),
+    ("engine_temp", 5.0, "°C"),
+]
+COLUMNS = ("speed", "rpm", "engine_temp", "fuel_consumption")
+
+# Parallel aggregation is opt-in: set TRIP_STATS_WORKERS > 1 once
+# bench_trip_stats.py shows a speedup on the target host. Trips shorter than
+# TRIP_STATS_PARALLEL_MIN_SAMPLES are always aggregated inline.
+PARALLEL_MIN_SAMPLES = int(os.getenv("TRIP_STATS_PARALLEL_MIN_SAMPLES", 500_000))
+WORKERS = int(os.getenv("TRIP_STATS_WORKERS", 1))
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _exact_sum(values) -> Tuple[Union[Fraction, float], bool]:
+    """
+    Exact sum of ints/floats, grouped by denominator like statistics._sum,
+    so partial sums from different windows merge without rounding error.
+    Missing readings count as 0. As in statistics._sum, NaN or infinite
+    readings make the total the (float) sum of those readings alone.
+    """
+    partials: Dict[int, int] = {}
+    all_int = True
+    nonfinite: Optional[float] = None
+    for v in values:
+        if v is None:
+            continue
+        if isinstance(v, int):
+            n, d = v, 1
+        else:
+            all_int = False
+            if not math.isfinite(v):
+                nonfinite = v if nonfinite is None else nonfinite + v
+                continue
+            n, d = v.as_integer_ratio()
+        partials[d] = partials.get(d, 0) + n
+    if nonfinite is not None:
+        return nonfinite, all_int
+    return sum((Fraction(n, d) for d, n in partials.items()), Fraction(0)), all_int
+
+
+def _window_peaks(values, threshold: float, offset: int) -> List[Tuple[int, float]]:
+    """
+    (sample index, delta) wherever |delta| > threshold. `offset` is the trip
+    index of values[0], so windows report trip-wide indices.
+    """
+    peaks: List[Tuple[int, float]] = []
+    prev = values[0]
+    for i, cur in enumerate(values[1:], offset + 1):
         if prev is not None and cur is not None:
             delta = cur - prev
             if abs(delta) > threshold:
-                peaks.append({"timestamp": pt["timestamp"].strftime("%H:%M:%S"),
-                              "metric": key, "change": delta})
+                peaks.append((i, delta))
         prev = cur
     return peaks
 
 
-def compute_trip_stats(trip_data):
+@dataclass
+class TripAggregate:
+    """
+    Mergeable partial statistics for a contiguous run of samples.
+    Merging the aggregates of consecutive windows, in order, gives exactly
+    the aggregate of the whole run. Window peaks hold sample indices;
+    aggregate_trip resolves them to timestamps. A sum is a float only when
+    non-finite readings made it NaN or infinite; adding it to a Fraction
+    keeps it so.
+    """
+    count: int = 0
+    sums: Dict[str, Union[Fraction, float]] = field(default_factory=lambda: {k: Fraction(0) for k in MEAN_KEYS})
+    all_int: Dict[str, bool] = field(default_factory=lambda: {k: True for k in MEAN_KEYS})
+    max_rpm: Any = None
+    peaks: Dict[str, List[Tuple[Any, float]]] = field(
+        default_factory=lambda: {key: [] for key, _, _ in PEAK_METRICS})
+
+    def merge(self, other: "TripAggregate") -> "TripAggregate":
+        self.count += other.count
+        for k in MEAN_KEYS:
+            self.sums[k] += other.sums[k]
+            self.all_int[k] = self.all_int[k] and other.all_int[k]
+        if self.max_rpm is None or other.max_rpm > self.max_rpm:
+            self.max_rpm = other.max_rpm
+        for key in self.peaks:
+            self.peaks[key].extend(other.peaks[key])
+        return self
+
+    def mean(self, key: str):
+        """
+        Same value statistics.mean would return over the whole run.
+        """
+        value = self.sums[key] / self.count
+        if isinstance(value, float):
+            return value
+        if self.all_int[key] and value.denominator == 1:
+            return int(value)
+        return float(value)
+
+
+def _aggregate_window(columns: Dict[str, list], has_context: bool, offset: int = 0) -> TripAggregate:
+    """
+    Aggregate one window starting at trip index `offset`. When `has_context`
+    is set, the first sample is the last one of the previous window: it only
+    seeds peak deltas across the boundary and is not counted. Peaks are
+    returned as (sample index, delta).
+    """
+    own = 1 if has_context else 0
+    agg = TripAggregate(count=len(columns["rpm"]) - own)
+    for k in MEAN_KEYS:
+        agg.sums[k], agg.all_int[k] = _exact_sum(columns[k][own:])
+    agg.max_rpm = max(0 if v is None else v for v in columns["rpm"][own:])
+    for key, thr, _ in PEAK_METRICS:
+        agg.peaks[key] = _window_peaks(columns[key], thr, offset - own)
+    return agg
+
+
+Packed = Tuple[Union[array, list], Optional[bytes]]
+
+
+def _pack(values: list) -> Packed:
+    """
+    Compact, cheaply pickled column for the pool: int64 when every reading is
+    an int, float64 when every reading is a float, the list itself otherwise.
+    Missing readings travel as a separate byte mask (None when there are
+    none), so a NaN reading is never mistaken for a missing one.
+    """
+    mask = None
+    filled = values
+    if None in values:
+        mask = bytes(v is None for v in values)
+        filled = [0 if v is None else v for v in values]
+    try:
+        return array("q", filled), mask
+    except (TypeError, OverflowError):
+        pass
+    # array("d") would silently turn ints into floats, so only take floats.
+    if all(type(v) is float or missing for v, missing in zip(values, mask or bytes(len(values)))):
+        return array("d", filled), mask
+    return values, mask
+
+
+def _unpack(packed: Packed) -> list:
+    column, mask = packed
+    values = column.tolist() if isinstance(column, array) else list(column)
+    if mask:
+        values = [None if missing else v for v, missing in zip(values, mask)]
+    return values
+
+
+def _aggregate_packed(columns: Dict[str, Packed], has_context: bool, offset: int) -> TripAggregate:
+    return _aggregate_window({k: _unpack(v) for k, v in columns.items()}, has_context, offset)
+
+
+def _window_bounds(trip_data: List[Dict[str, Any]], n_windows: int) -> List[Tuple[int, int]]:
+    """
+    Split the (time-ordered) samples into up to `n_windows` equal time spans.
+    Bounds are forced monotonic so the windows always tile the whole trip.
+    """
+    start, end = trip_data[0]["timestamp"], trip_data[-1]["timestamp"]
+    step = (end - start) / n_windows
+    cuts = [0]
+    for i in range(1, n_windows):
+        bound = start + step * i
+        lo, hi = cuts[-1], len(trip_data)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if trip_data[mid]["timestamp"] < bound:
+                lo = mid + 1
+            else:
+                hi = mid
+        cuts.append(lo)
+    cuts.append(len(trip_data))
+    return [(a, b) for a, b in zip(cuts, cuts[1:]) if b > a]
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn rather than fork: the server process runs threads.
+        _pool = ProcessPoolExecutor(max_workers=WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def aggregate_trip(trip_data: List[Dict[str, Any]], *, parallel: Optional[bool] = None) -> TripAggregate:
+    """
+    Aggregate a trip, map-reducing time windows over a process pool when the
+    trip is long. The result is identical to the single-window computation.
+    """
+    if parallel is None:
+        parallel = WORKERS > 1 and len(trip_data) >= PARALLEL_MIN_SAMPLES
+
+    if not parallel:
+        agg = _aggregate_window({k: [pt.get(k) for pt in trip_data] for k in COLUMNS}, has_context=False)
+    else:
+        pool = _get_pool()
+        futures = []
+        for a, b in _window_bounds(trip_data, WORKERS * 2):
+            lo = a - 1 if a else a
+            window = trip_data[lo:b]
+            futures.append(pool.submit(
+                _aggregate_packed,
+                {k: _pack([pt.get(k) for pt in window]) for k in COLUMNS},
+                bool(a),
+                a,
+            ))
+        agg = TripAggregate()
+        for fut in futures:
+            agg.merge(fut.result())
+
+    agg.peaks = {key: [(trip_data[i]["timestamp"], delta) for i, delta in peaks]
+                 for key, peaks in agg.peaks.items()}
+    return agg
+
+
+def compute_trip_stats(trip_data, agg: Optional[TripAggregate] = None):
     if not trip_data:
         return {}
+    agg = agg or aggregate_trip(trip_data)
     return {
         "trip_id": trip_data[0]["trip_id"],
-        "avg_speed": round(statistics.mean(pt.get("speed", 0) for pt in trip_data), 1),
-        "max_rpm": max(pt.get("rpm", 0) for pt in trip_data),
-        "avg_temp": round(statistics.mean(pt.get("engine_temp", 0) for pt in trip_data), 1),
-        "avg_consumption": round(statistics.mean(pt.get("fuel_consumption", 0) for pt in trip_data), 1),
-        "critical_events": _gather_critical(trip_data)
+        "avg_speed": round(agg.mean("speed"), 1),
+        "max_rpm": agg.max_rpm,
+        "avg_temp": round(agg.mean("engine_temp"), 1),
+        "avg_consumption": round(agg.mean("fuel_consumption"), 1),
+        "critical_events": _gather_critical(agg)
     }
 
 
-def _gather_critical(trip_data):
-    metrics = [
-        ("rpm", 1000, "RPM"),
-        ("fuel_consumption", 2.0, "L/100km"),
-        ("engine_temp", 5.0, "°C"),
-    ]
+def _gather_critical(agg: TripAggregate):
     events = []
-    for key, thr, unit in metrics:
-        for evt in detect_peaks(trip_data, key, thr):
-            evt.update({"unit": unit})
-            events.append(evt)
+    for key, _, unit in PEAK_METRICS:
+        for ts, delta in agg.peaks[key]:
+            events.append({"timestamp": ts.strftime("%H:%M:%S"),
+                           "metric": key, "change": delta, "unit": unit})
     return events
@@ -1,9 +1,11 @@
+import asyncio
 from contextlib import asynccontextmanager
 
 from dotenv import load_dotenv
 from fastapi import FastAPI
-from api import analyze, ingest
-from database.engine import init_db
+from api import analyze, ingest, status
+from database.engine import init_db, warm_pool
+from llm.telemetry import shutdown_pool
 
 
 load_dotenv()
@@ -18,8 +20,13 @@ async def lifespan(_: FastAPI):
     except Exception as e:
         print(f"Failed to initialize database: {e}")
         raise RuntimeError(f"Database initialization failed: {e}")
+
+    # Readiness flips once the pool is warm; serving starts right away.
+    warmer = asyncio.create_task(warm_pool())
     yield
     print("Shutting down application...")
+    warmer.cancel()
+    shutdown_pool()
 
 
 app = FastAPI(
@@ -31,3 +38,4 @@ app = FastAPI(
 
 app.include_router(ingest.router, prefix="/api/v1", tags=["Ingestion"])
 app.include_router(analyze.router, prefix="/api/v1", tags=["Analysis"])
+app.include_router(status.router, prefix="/api/v1", tags=["Status"])
@@ -1 +1,3 @@
-from .chatgpt import *
\ No newline at end of file
+from .admission import *
+from .chatgpt import *
+from .etag import *
\ No newline at end of file
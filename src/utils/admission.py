@@ -0,0 +1,322 @@
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Request
+
+
+INGEST = "ingest"
+ANALYZE = "analyze"
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+@dataclass(frozen=True)
+class RoutePolicy:
+    """
+    Admission limits for one route. Lower priority values are served first.
+    """
+    priority: int
+    max_concurrent: int
+    max_queue: int
+    max_wait: float
+
+
+class TokenBucket:
+    """
+    Classic token bucket refilled continuously at `rate` tokens per second.
+    """
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, now: Optional[float] = None) -> float:
+        """
+        Consume one token. Return 0 when granted, otherwise the number of
+        seconds until a token becomes available.
+        """
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class RateLimiter:
+    """
+    One token bucket per key (client address, vehicle id, ...).
+    Idle buckets are pruned once more than `max_keys` are tracked.
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 10_000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.limited = 0
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def check(self, key: str) -> float:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._prune(now)
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+        retry_after = bucket.take(now)
+        if retry_after:
+            self.limited += 1
+        return retry_after
+
+    def _prune(self, now: float) -> None:
+        for key in [k for k, b in self._buckets.items() if b.is_full(now)]:
+            del self._buckets[key]
+
+
+class AdmissionController:
+    """
+    Bounds concurrent work per route and overall, queueing excess requests
+    in priority order. Requests whose expected wait exceeds their budget,
+    or that find the queue full, are rejected immediately.
+    """
+
+    def __init__(self, capacity: int, policies: Dict[str, RoutePolicy]):
+        self.capacity = capacity
+        self.policies = policies
+        self.total = 0
+        self.in_flight = {route: 0 for route in policies}
+        self.queued = {route: 0 for route in policies}
+        self.admitted = {route: 0 for route in policies}
+        self.shed = {route: 0 for route in policies}
+        self._service_time = {route: 0.0 for route in policies}
+        self._waiters: List[Tuple[int, int, str, asyncio.Future]] = []
+        self._seq = itertools.count()
+
+    def _can_run(self, route: str) -> bool:
+        return (self.total < self.capacity
+                and self.in_flight[route] < self.policies[route].max_concurrent)
+
+    def _queued_ahead(self, priority: int) -> int:
+        return sum(n for route, n in self.queued.items()
+                   if self.policies[route].priority <= priority)
+
+    def _expected_wait(self, route: str) -> float:
+        policy = self.policies[route]
+        return self._service_time[route] * (self.queued[route] + 1) / policy.max_concurrent
+
+    def _start(self, route: str) -> None:
+        self.total += 1
+        self.in_flight[route] += 1
+        self.admitted[route] += 1
+
+    def _reject(self, route: str) -> None:
+        self.shed[route] += 1
+        retry_after = max(1, math.ceil(self._expected_wait(route)))
+        raise HTTPException(
+            status_code=503,
+            detail="Server is overloaded, please retry later",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    def _dispatch(self) -> None:
+        blocked = []
+        while self._waiters and self.total < self.capacity:
+            item = heapq.heappop(self._waiters)
+            _, _, route, fut = item
+            if fut.done():
+                continue
+            if self.in_flight[route] >= self.policies[route].max_concurrent:
+                blocked.append(item)
+                continue
+            self.queued[route] -= 1
+            self._start(route)
+            fut.set_result(None)
+        for item in blocked:
+            heapq.heappush(self._waiters, item)
+
+    async def acquire(self, route: str, budget: Optional[float] = None) -> None:
+        """
+        Wait for a slot on `route`, for at most `budget` seconds (capped by
+        the route's max_wait). Raises a 503 HTTPException when shedding.
+        """
+        policy = self.policies[route]
+        if self._can_run(route) and not self._queued_ahead(policy.priority):
+            self._start(route)
+            return
+
+        wait = policy.max_wait
+        if budget is not None and math.isfinite(budget):
+            wait = min(max(budget, 0.0), policy.max_wait)
+        if self.queued[route] >= policy.max_queue or self._expected_wait(route) > wait:
+            self._reject(route)
+
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (policy.priority, next(self._seq), route, fut))
+        self.queued[route] += 1
+        try:
+            await asyncio.wait({fut}, timeout=wait)
+        except asyncio.CancelledError:
+            if fut.done():
+                self.release(route)
+            else:
+                fut.cancel()
+                self.queued[route] -= 1
+            raise
+        if not fut.done():
+            fut.cancel()
+            self.queued[route] -= 1
+            self._reject(route)
+
+    def release(self, route: str, elapsed: Optional[float] = None) -> None:
+        self.total -= 1
+        self.in_flight[route] -= 1
+        if elapsed is not None:
+            previous = self._service_time[route]
+            self._service_time[route] = elapsed if not previous else 0.8 * previous + 0.2 * elapsed
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, route: str, budget: Optional[float] = None) -> AsyncIterator[None]:
+        await self.acquire(route, budget)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(route, time.monotonic() - started)
+
+    def stats(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "in_flight": self.total,
+            "routes": {
+                route: {
+                    "in_flight": self.in_flight[route],
+                    "queued": self.queued[route],
+                    "admitted": self.admitted[route],
+                    "shed": self.shed[route],
+                    "avg_service_seconds": round(self._service_time[route], 3),
+                }
+                for route in self.policies
+            },
+        }
+
+
+# Connections the DB pool can hand out (same settings and defaults as
+# database.engine): admission never grants more slots than that.
+_POOL_CAPACITY = _env_int("DB_POOL_SIZE", 10) + _env_int("DB_POOL_MAX_OVERFLOW", 20)
+
+
+# Ingest always wins: it has the best priority and may use the whole
+# capacity, while analysis is capped well below it.
+Admission = AdmissionController(
+    capacity=min(_env_int("ADMISSION_CAPACITY", _POOL_CAPACITY), _POOL_CAPACITY),
+    policies={
+        INGEST: RoutePolicy(
+            priority=0,
+            max_concurrent=_env_int("INGEST_MAX_CONCURRENT", _POOL_CAPACITY),
+            max_queue=_env_int("INGEST_MAX_QUEUE", 1000),
+            max_wait=_env_float("INGEST_MAX_WAIT", 30.0),
+        ),
+        ANALYZE: RoutePolicy(
+            priority=10,
+            max_concurrent=_env_int("ANALYZE_MAX_CONCURRENT", 8),
+            max_queue=_env_int("ANALYZE_MAX_QUEUE", 32),
+            max_wait=_env_float("ANALYZE_MAX_WAIT", 5.0),
+        ),
+    },
+)
+ClientLimiter = RateLimiter(
+    rate=_env_float("ANALYZE_CLIENT_RATE", 0.5),
+    burst=_env_float("ANALYZE_CLIENT_BURST", 5),
+)
+VehicleLimiter = RateLimiter(
+    rate=_env_float("ANALYZE_VEHICLE_RATE", 0.2),
+    burst=_env_float("ANALYZE_VEHICLE_BURST", 3),
+)
+
+
+def _rate_limited(retry_after: float, what: str) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail=f"Too many analysis requests for this {what}",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+def check_vehicle_rate(vehicle_id: str) -> None:
+    retry_after = VehicleLimiter.check(vehicle_id)
+    if retry_after:
+        raise _rate_limited(retry_after, "vehicle")
+
+
+def _client_budget(request: Request) -> Optional[float]:
+    """
+    Optional X-Request-Timeout header: how many seconds the caller is
+    willing to wait for a slot.
+    """
+    try:
+        budget = float(request.headers["X-Request-Timeout"])
+    except (KeyError, ValueError):
+        return None
+    # NaN or inf would disable the deadline entirely; ignore them.
+    return budget if math.isfinite(budget) else None
+
+
+@asynccontextmanager
+async def admission_slot(route: str, request: Request) -> AsyncIterator[None]:
+    """
+    Hold an admission slot for `route`, after charging the caller's client
+    token bucket for analysis requests.
+    """
+    if route == ANALYZE:
+        client = request.client.host if request.client else "unknown"
+        retry_after = ClientLimiter.check(client)
+        if retry_after:
+            raise _rate_limited(retry_after, "client")
+    async with Admission.slot(route, _client_budget(request)):
+        yield
+
+
+def admission_dependency(route: str):
+    """
+    FastAPI dependency holding an admission slot for `route` for the
+    duration of the request.
+    """
+    async def dependency(request: Request):
+        async with admission_slot(route, request):
+            yield
+
+    return dependency
+
+
+def admission_stats() -> dict:
+    stats = Admission.stats()
+    stats["rate_limited"] = {
+        "client": ClientLimiter.limited,
+        "vehicle": VehicleLimiter.limited,
+    }
+    return stats
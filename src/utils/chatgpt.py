@@ -1,60 +1,52 @@
 import os
 import json
-import statistics
-from datetime import datetime
-from typing import Any, Dict, List, Tuple
-
-from openai import OpenAI
-from openai.types.chat import (
-    ChatCompletionMessageParam,
-    ChatCompletionSystemMessageParam,
-    ChatCompletionUserMessageParam,
-    ChatCompletionFunctionCallOptionParam,
-)
-from openai.types.chat.completion_create_params import Function
+import re
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
 
+from llm.telemetry import TripAggregate, aggregate_trip
 from schemas.models import TripAnalysis
 
+if TYPE_CHECKING:
+    # Importing openai costs hundreds of milliseconds; the client is only
+    # built on the first analysis request.
+    from openai import OpenAI
+    from openai.types.chat import (
+        ChatCompletionMessageParam,
+        ChatCompletionFunctionCallOptionParam,
+    )
+    from openai.types.chat.completion_create_params import Function
 
-client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
 
+_client: Optional["OpenAI"] = None
 
-def _detect_peaks(
-        data: List[Dict[str, Any]],
-        key: str,
-        threshold: float,
-) -> List[Tuple[datetime, float]]:
-    """
-    One‐pass detection of (timestamp, delta) where |delta| > threshold.
-    """
-    peaks: List[Tuple[datetime, float]] = []
-    prev = data[0].get(key)
-    for pt in data[1:]:
-        cur = pt.get(key)
-        if prev is not None and cur is not None:
-            delta = cur - prev
-            if abs(delta) > threshold:
-                peaks.append((pt["timestamp"], delta))
-        prev = cur
-    return peaks
-
-
-def format_trip_data_for_analysis(trip_data: List[Dict[str, Any]]) -> str:
+
+def get_client() -> "OpenAI":
+    global _client
+    if _client is None:
+        from openai import OpenAI
+        _client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
+    return _client
+
+
+def format_trip_data_for_analysis(
+        trip_data: List[Dict[str, Any]],
+        agg: Optional[TripAggregate] = None,
+) -> str:
     """
     Return the same markdown summary your original code produced.
     """
     if not trip_data:
         return "No data available for this trip."
 
-    mean = statistics.mean
-    avg_speed = mean(p.get("speed", 0) for p in trip_data)
-    max_rpm = max(p.get("rpm", 0) for p in trip_data)
-    avg_temp = mean(p.get("engine_temp", 0) for p in trip_data)
-    avg_cons = mean(p.get("fuel_consumption", 0) for p in trip_data)
+    agg = agg or aggregate_trip(trip_data)
+    avg_speed = agg.mean("speed")
+    max_rpm = agg.max_rpm
+    avg_temp = agg.mean("engine_temp")
+    avg_cons = agg.mean("fuel_consumption")
 
-    rpm_peaks = _detect_peaks(trip_data, "rpm", 1000.0)
-    cons_peaks = _detect_peaks(trip_data, "fuel_consumption", 2.0)
-    temp_peaks = _detect_peaks(trip_data, "engine_temp", 5.0)
+    rpm_peaks = agg.peaks["rpm"]
+    cons_peaks = agg.peaks["fuel_consumption"]
+    temp_peaks = agg.peaks["engine_temp"]
 
     critical: List[str] = []
     for ts, d in rpm_peaks:
@@ -79,38 +71,28 @@ Critical moments of the trip:
 """
 
 
-def analyze_trip_with_chatgpt(
-        trip_data: List[Dict[str, Any]],
-        *,
-        model: str = "o4-mini-2025-04-16",
-        debug: bool = False,
-) -> TripAnalysis:
+def _build_request(formatted: str) -> Dict[str, Any]:
     """
-    Send the formatted trip block to OpenAI, use function-calling
-    to get back strict JSON, and return a TripAnalysis.
+    Messages and function-calling parameters for the trip analysis call.
     """
-    formatted = format_trip_data_for_analysis(trip_data)
-    if debug:
-        print("DEBUG – formatted block\n", formatted)
-
     # 1. Build typed messages
     messages: List[ChatCompletionMessageParam] = [
-        ChatCompletionSystemMessageParam(
-            role="system",
-            content="You are an expert in automotive telemetry data analysis. "
+        {
+            "role": "system",
+            "content": "You are an expert in automotive telemetry data analysis. "
                     "Analyze the trip, provide a summary, suggestions, general advice, "
                     "and calculate an ecological score (eco_score) between 0 and 100, "
                     "where 100 is highly ecological and 0 is not ecological at all. "
                     "Also, estimate the fuel saved in liters (fuel_saved_liters) and CO2 emissions avoided in kilograms (co2_avoided_kg) "
                     "compared to a less ecological driving style for the same trip. If the driving was not ecological, these values can be 0 or negative.",
-        ),
-        ChatCompletionUserMessageParam(
-            role="user",
-            content=(
+        },
+        {
+            "role": "user",
+            "content": (
                     "Analyze the following telemetry summary and respond ONLY via the "
                     "function call.\n\n" + formatted
             ),
-        ),
+        },
     ]
 
     # 2. Define strict JSON schema
@@ -156,61 +138,231 @@ def analyze_trip_with_chatgpt(
 
     # 3. Prepare function-calling params
     functions: List[Function] = [
-        Function(
-            name="report_trip_analysis",
-            description="Return summary, suggestions, general advice, eco_score, fuel_saved_liters, and co2_avoided_kg",
-            parameters=schema,
-        )
+        {
+            "name": "report_trip_analysis",
+            "description": "Return summary, suggestions, general advice, eco_score, fuel_saved_liters, and co2_avoided_kg",
+            "parameters": schema,
+        }
     ]
     function_call_option: ChatCompletionFunctionCallOptionParam = {
         "name": "report_trip_analysis"
     }
 
-    # 4. Call OpenAI
-    response = client.chat.completions.create(
-        model=model,
-        messages=messages,
-        functions=functions,
-        function_call=function_call_option,
+    return {
+        "messages": messages,
+        "functions": functions,
+        "function_call": function_call_option,
+    }
+
+
+def _build_analysis(trip_data: List[Dict[str, Any]], result: Dict[str, Any]) -> TripAnalysis:
+    suggestions = [f"At {s['timestamp']}: {s['advice']}" for s in result["suggestions"]]
+    return TripAnalysis(
+        trip_id=trip_data[0]["trip_id"],
+        summary=result["summary"],
+        suggestions=suggestions,
+        general_advice=result.get("general_advice"),
+        eco_score=result["eco_score"],
+        fuel_saved_liters=result.get("fuel_saved_liters"),
+        co2_avoided_kg=result.get("co2_avoided_kg"),
+        plain_text=json.dumps(result, ensure_ascii=False), # Storing the parsed result
     )
 
-    msg = response.choices[0].message
 
-    if not msg.function_call:
-        error_content = msg.content if msg.content else "No content provided by API."
+def _parse_function_call(name: Optional[str], arguments: str, role: str, content: Optional[str]) -> Dict[str, Any]:
+    if name is None:
+        error_content = content if content else "No content provided by API."
         raise RuntimeError(
             f"Expected a function call from OpenAI, but none was received. "
-            f"Message role: '{msg.role}'. API content: '{error_content}'"
+            f"Message role: '{role}'. API content: '{error_content}'"
         )
 
-    if msg.function_call.name != "report_trip_analysis":
+    if name != "report_trip_analysis":
         raise RuntimeError(
-            f"Expected function call to 'report_trip_analysis', but received '{msg.function_call.name}'."
+            f"Expected function call to 'report_trip_analysis', but received '{name}'."
         )
 
     try:
-        # Arguments are in msg.function_call.arguments as a JSON string
-        function_arguments_json = msg.function_call.arguments
-        result = json.loads(function_arguments_json)
+        return json.loads(arguments)
     except json.JSONDecodeError as e:
         raise RuntimeError(
             f"Failed to parse function call arguments as JSON: {e}. "
-            f"Raw arguments: '{msg.function_call.arguments}'"
+            f"Raw arguments: '{arguments}'"
         )
 
+
+def analyze_trip_with_chatgpt(
+        trip_data: List[Dict[str, Any]],
+        *,
+        model: str = "o4-mini-2025-04-16",
+        debug: bool = False,
+        agg: Optional[TripAggregate] = None,
+) -> TripAnalysis:
+    """
+    Send the formatted trip block to OpenAI, use function-calling
+    to get back strict JSON, and return a TripAnalysis.
+    """
+    formatted = format_trip_data_for_analysis(trip_data, agg)
+    if debug:
+        print("DEBUG – formatted block\n", formatted)
+
+    response = get_client().chat.completions.create(model=model, **_build_request(formatted))
+
+    msg = response.choices[0].message
+    call = msg.function_call
+    result = _parse_function_call(
+        call.name if call else None,
+        call.arguments if call else "",
+        msg.role,
+        msg.content,
+    )
+
     if debug:
-        print("DEBUG – GPT function call arguments (raw string):\n", msg.function_call.arguments)
+        print("DEBUG – GPT function call arguments (raw string):\n", call.arguments)
         print("DEBUG – GPT output (parsed arguments JSON):\n", json.dumps(result, indent=2))
 
-    # 5. Build TripAnalysis
-    suggestions = [f"At {s['timestamp']}: {s['advice']}" for s in result["suggestions"]]
-    return TripAnalysis(
-        trip_id=trip_data[0]["trip_id"],
-        summary=result["summary"],
-        suggestions=suggestions,
-        general_advice=result.get("general_advice"),
-        eco_score=result["eco_score"],
-        fuel_saved_liters=result.get("fuel_saved_liters"),
-        co2_avoided_kg=result.get("co2_avoided_kg"),
-        plain_text=json.dumps(result, ensure_ascii=False), # Storing the parsed result
-    )
+    return _build_analysis(trip_data, result)
+
+
+class _PartialArguments:
+    """
+    Incrementally extracts fields from the function-call arguments while the
+    JSON is still arriving: the growing `summary` string and each completed
+    item of `suggestions` and `general_advice`. Every scan resumes where the
+    previous one stopped, so a whole stream is parsed in linear time.
+    """
+    _SUMMARY = re.compile(r'"summary"\s*:\s*"')
+    _ARRAYS = {key: re.compile(r'"{}"\s*:\s*\['.format(key)) for key in ("suggestions", "general_advice")}
+    # Keys are searched for again only in the tail of the previous buffer
+    # that could hold the start of a match split across chunks.
+    _KEY_OVERLAP = 64
+    _decoder = json.JSONDecoder()
+
+    def __init__(self):
+        self.buffer = ""
+        self._summary_pos: Optional[int] = None
+        self._summary_done = False
+        self._search_from = 0
+        self._array_pos: Dict[str, Optional[int]] = {key: None for key in self._ARRAYS}
+        self._array_done: Dict[str, bool] = {key: False for key in self._ARRAYS}
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        # Appending through a sole local reference lets CPython grow the
+        # string in place instead of copying the whole buffer every chunk.
+        buffer, self.buffer = self.buffer, ""
+        buffer += chunk
+        self.buffer = buffer
+        events = []
+        summary = self._summary_delta()
+        if summary:
+            events.append(("summary", summary))
+        for key in self._array_pos:
+            for item in self._array_items(key):
+                if key == "suggestions":
+                    item = f"At {item.get('timestamp')}: {item.get('advice')}"
+                events.append((key, item))
+        self._search_from = max(0, len(self.buffer) - self._KEY_OVERLAP)
+        return events
+
+    def _summary_delta(self) -> str:
+        """
+        Summary text completed since the previous call.
+        """
+        if self._summary_done:
+            return ""
+        if self._summary_pos is None:
+            match = self._SUMMARY.search(self.buffer, self._search_from)
+            if not match:
+                return ""
+            self._summary_pos = match.end()
+        buffer, start = self.buffer, self._summary_pos
+        i = start
+        while i < len(buffer):
+            ch = buffer[i]
+            if ch == '"':
+                self._summary_done = True
+                break
+            if ch == "\\":
+                # Escapes are consumed only once complete (\uXXXX needs 6 chars).
+                size = 6 if buffer[i + 1:i + 2] == "u" else 2
+                if i + size > len(buffer):
+                    break
+                i += size
+                continue
+            i += 1
+        text = json.loads('"' + buffer[start:i] + '"')
+        if not self._summary_done and text and "\ud800" <= text[-1] <= "\udbff":
+            # High half of a surrogate pair; decode it with the low half.
+            text = text[:-1]
+            i -= 6
+        self._summary_pos = i
+        return text
+
+    def _array_items(self, key: str) -> List[Any]:
+        if self._array_done[key]:
+            return []
+        pos = self._array_pos[key]
+        if pos is None:
+            match = self._ARRAYS[key].search(self.buffer, self._search_from)
+            if not match:
+                return []
+            pos = match.end()
+        items = []
+        while True:
+            while pos < len(self.buffer) and self.buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(self.buffer):
+                break
+            if self.buffer[pos] == "]":
+                self._array_done[key] = True
+                break
+            try:
+                item, end = self._decoder.raw_decode(self.buffer, pos)
+            except json.JSONDecodeError:
+                break
+            # A bare number may still be growing ("3" of "3.5"); only trust
+            # it once the next token closes the item.
+            if not isinstance(item, (dict, list, str)) and self._next_token(end) not in (",", "]"):
+                break
+            items.append(item)
+            pos = end
+        self._array_pos[key] = pos
+        return items
+
+    def _next_token(self, pos: int) -> str:
+        while pos < len(self.buffer) and self.buffer[pos] in " \t\r\n":
+            pos += 1
+        return self.buffer[pos:pos + 1]
+
+
+def stream_trip_analysis_with_chatgpt(
+        trip_data: List[Dict[str, Any]],
+        *,
+        model: str = "o4-mini-2025-04-16",
+        agg: Optional[TripAggregate] = None,
+) -> Iterator[Tuple[str, Any]]:
+    """
+    Streaming variant of analyze_trip_with_chatgpt. Yields ("summary", text),
+    ("suggestions", str) and ("general_advice", str) events as tokens arrive,
+    then ("analysis", TripAnalysis) once the full arguments are validated.
+    """
+    formatted = format_trip_data_for_analysis(trip_data, agg)
+    stream = get_client().chat.completions.create(model=model, stream=True, **_build_request(formatted))
+
+    partial = _PartialArguments()
+    name: Optional[str] = None
+    content: List[str] = []
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        if delta.content:
+            content.append(delta.content)
+        if delta.function_call:
+            if delta.function_call.name:
+                name = delta.function_call.name
+            if delta.function_call.arguments:
+                yield from partial.feed(delta.function_call.arguments)
+
+    result = _parse_function_call(name, partial.buffer, "assistant", "".join(content) or None)
+    yield "analysis", _build_analysis(trip_data, result)
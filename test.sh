@@ -2,4 +2,7 @@
 
 # Exécuter les tests
 echo "Exécution des tests..."
-python3 test_api.py 
\ No newline at end of file
+python3 test_api.py 
+python3 test_trip_stats.py
+python3 test_analysis_stream.py
+python3 test_admission.py
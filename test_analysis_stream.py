@@ -0,0 +1,94 @@
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from utils.chatgpt import _PartialArguments  # noqa: E402
+
+
+ARGUMENTS = {
+    "summary": 'Smooth "eco" driving,\nthen a \\ hard stop — température élevée 🚗 at the end.',
+    "suggestions": [
+        {"timestamp": "14:15:00", "advice": "Ease off [gently], avoid {sudden} braking"},
+        {"timestamp": "14:20:30", "advice": "Shift up earlier, \"around\" 2500 RPM"},
+        {"timestamp": "14:31:05", "advice": "Anticipate the roundabout 🚦"},
+    ],
+    "general_advice": ["Keep tyres inflated", "Plan, then drive: fewer stops, less fuel"],
+    "eco_score": 72,
+    "fuel_saved_liters": 0.4,
+    "co2_avoided_kg": 0.9,
+}
+
+
+def feed_in_chunks(raw: str, sizes) -> list:
+    parser, events, pos = _PartialArguments(), [], 0
+    for size in sizes:
+        if pos >= len(raw):
+            break
+        events += parser.feed(raw[pos:pos + size])
+        pos += size
+    if pos < len(raw):
+        events += parser.feed(raw[pos:])
+    assert parser.buffer == raw
+    return events
+
+
+def check_events(events: list) -> None:
+    summary = "".join(data for event, data in events if event == "summary")
+    assert summary == ARGUMENTS["summary"], summary
+    assert [data for event, data in events if event == "suggestions"] == [
+        f"At {s['timestamp']}: {s['advice']}" for s in ARGUMENTS["suggestions"]
+    ]
+    assert [data for event, data in events if event == "general_advice"] == ARGUMENTS["general_advice"]
+
+
+def test_single_chunk():
+    for raw in (json.dumps(ARGUMENTS), json.dumps(ARGUMENTS, ensure_ascii=False, indent=2)):
+        check_events(feed_in_chunks(raw, [len(raw)]))
+
+
+def test_one_character_chunks():
+    # ensure_ascii splits the emoji into a 🚗 surrogate pair escape.
+    raw = json.dumps(ARGUMENTS)
+    check_events(feed_in_chunks(raw, [1] * len(raw)))
+
+
+def test_random_chunks():
+    rng = random.Random(0)
+    for ensure_ascii in (True, False):
+        raw = json.dumps(ARGUMENTS, ensure_ascii=ensure_ascii, indent=rng.choice([None, 1]))
+        for _ in range(200):
+            check_events(feed_in_chunks(raw, iter(lambda: rng.randint(1, 8), None)))
+
+
+def test_summary_streams_incrementally():
+    raw = json.dumps(ARGUMENTS)
+    events = feed_in_chunks(raw, [5] * (len(raw) // 5 + 1))
+    assert len([1 for event, _ in events if event == "summary"]) > 5
+
+
+def test_numbers_in_arrays():
+    # "3" of "3.5" must not be emitted before the number is delimited.
+    raw = '{"summary": "ok", "general_advice": [12, 3.5, "z", -1e3 , true]}'
+    for size in (1, 2, 3):
+        events = feed_in_chunks(raw, [size] * len(raw))
+        assert [data for event, data in events if event == "general_advice"] == [12, 3.5, "z", -1e3, True], size
+
+
+def main():
+    print("=== Starting Analysis Stream Parser Tests ===")
+    for test in (test_single_chunk, test_one_character_chunks,
+                 test_random_chunks, test_summary_streams_incrementally,
+                 test_numbers_in_arrays):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            print(f"❌ {test.__name__}: {e}")
+    print("\n=== Tests Completed ===")
+
+
+if __name__ == "__main__":
+    main()
@@ -174,8 +174,84 @@ def test_analyze_api(trip_id: str):
         print(f"❌ Error during analysis test: {e}")
         print("Please check if the API server is running and accessible.")
 
+def test_conditional_analyze(trip_id: str):
+    """Test that polling an unchanged trip with its ETag returns 304"""
+    print("\n=== Testing Conditional Analysis ===")
+
+    try:
+        response = requests.get(f"{BASE_URL}/analyze/{trip_id}")
+        response.raise_for_status()
+        etag = response.headers.get("ETag")
+        if not etag:
+            print("❌ No ETag returned by the analysis API")
+            return
+
+        response = requests.get(f"{BASE_URL}/analyze/{trip_id}", headers={"If-None-Match": etag})
+        if response.status_code == 304:
+            print(f"✅ Conditional request returned 304 for ETag {etag}")
+        else:
+            print(f"❌ Expected 304, got {response.status_code}")
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Error during conditional analysis test: {e}")
+
+def test_stream_analyze_api(trip_id: str):
+    """Test the server-sent-events analysis API"""
+    print("\n=== Testing Streaming Analysis API ===")
+
+    try:
+        start = time.time()
+        events = []
+        with requests.get(f"{BASE_URL}/analyze/{trip_id}/stream", stream=True) as response:
+            response.raise_for_status()
+            event = None
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                elif line.startswith("data: "):
+                    if not events:
+                        print(f"First event '{event}' after {time.time() - start:.2f}s")
+                    events.append((event, json.loads(line[len("data: "):])))
+
+        names = [name for name, _ in events]
+        if names and names[0] == "stats" and names[-1] == "analysis":
+            print(f"✅ Streaming test successful: {len(events)} events, report {events[-1][1]['report_id']}")
+        else:
+            print(f"❌ Unexpected event sequence: {names}")
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Error during streaming analysis test: {e}")
+
+def test_readiness():
+    """Test the readiness probe"""
+    print("\n=== Testing Readiness ===")
+
+    try:
+        response = requests.get(f"{BASE_URL}/status/ready")
+        if response.status_code == 200:
+            print("✅ Service is ready: connection pool is warm")
+        else:
+            print(f"❌ Service not ready ({response.status_code}): {response.json().get('detail')}")
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Error during readiness test: {e}")
+
+def test_admission_status():
+    """Test the admission-control status endpoint"""
+    print("\n=== Testing Admission Status ===")
+
+    try:
+        response = requests.get(f"{BASE_URL}/status/admission")
+        response.raise_for_status()
+        stats = response.json()
+        for route in ("ingest", "analyze"):
+            route_stats = stats["routes"][route]
+            print(f"✅ {route}: in flight {route_stats['in_flight']}, queued {route_stats['queued']}, "
+                  f"admitted {route_stats['admitted']}, shed {route_stats['shed']}")
+    except (requests.exceptions.RequestException, KeyError) as e:
+        print(f"❌ Error during admission status test: {e}")
+
 def main():
     print("=== Starting API Tests ===")
+
+    test_readiness()
     
     # Test ingestion
     trip_id = test_ingest_api()
@@ -183,7 +259,11 @@ def main():
     if trip_id:
         # Test analysis
         test_analyze_api(trip_id)
+        test_conditional_analyze(trip_id)
+        test_stream_analyze_api(trip_id)
     
+    test_admission_status()
+
     print("\n=== Tests Completed ===")
 
 if __name__ == "__main__":
@@ -0,0 +1,155 @@
+import math
+import os
+import random
+import statistics
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from llm import telemetry  # noqa: E402
+
+
+def serial_reference(trip_data: list) -> dict:
+    """The original one-pass statistics, kept here as the oracle"""
+    def peaks(key, threshold, unit):
+        found, prev = [], trip_data[0].get(key)
+        for pt in trip_data[1:]:
+            cur = pt.get(key)
+            if prev is not None and cur is not None:
+                delta = cur - prev
+                if abs(delta) > threshold:
+                    found.append({"timestamp": pt["timestamp"].strftime("%H:%M:%S"),
+                                  "metric": key, "change": delta, "unit": unit})
+            prev = cur
+        return found
+
+    def value(pt, key):
+        v = pt.get(key, 0)
+        return 0 if v is None else v
+
+    return {
+        "trip_id": trip_data[0]["trip_id"],
+        "avg_speed": round(statistics.mean(value(pt, "speed") for pt in trip_data), 1),
+        "max_rpm": max(value(pt, "rpm") for pt in trip_data),
+        "avg_temp": round(statistics.mean(value(pt, "engine_temp") for pt in trip_data), 1),
+        "avg_consumption": round(statistics.mean(value(pt, "fuel_consumption") for pt in trip_data), 1),
+        "critical_events": [evt for key, thr, unit in telemetry.PEAK_METRICS for evt in peaks(key, thr, unit)],
+    }
+
+
+def generate_trip(samples: int, missing_ratio: float = 0.01, seed: int = 0) -> list:
+    """Random trip with large jumps and occasional missing readings"""
+    rng = random.Random(seed)
+    start = datetime(2024, 3, 20, 14, 30)
+    data = []
+    for i in range(samples):
+        point = {
+            "vehicle_id": "vehicle_1",
+            "trip_id": "trip_1",
+            "timestamp": start + timedelta(seconds=i),
+            "rpm": rng.randint(800, 6000),
+            "speed": rng.uniform(0, 130),
+            "fuel_consumption": round(rng.uniform(3, 12), 1),
+            "engine_temp": round(rng.uniform(70, 110), 1),
+        }
+        for key in telemetry.COLUMNS:
+            if rng.random() < missing_ratio:
+                point[key] = None
+        data.append(point)
+    return data
+
+
+def merge_windows(trip_data: list, n_windows: int) -> telemetry.TripAggregate:
+    """Windowed aggregation without the pool, through the packed payloads the workers receive"""
+    total = telemetry.TripAggregate()
+    for a, b in telemetry._window_bounds(trip_data, n_windows):
+        lo = a - 1 if a else a
+        window = trip_data[lo:b]
+        columns = {k: telemetry._pack([pt.get(k) for pt in window]) for k in telemetry.COLUMNS}
+        total.merge(telemetry._aggregate_packed(columns, bool(a), a))
+    total.peaks = {key: [(trip_data[i]["timestamp"], d) for i, d in peaks]
+                   for key, peaks in total.peaks.items()}
+    return total
+
+
+def test_serial_matches_reference():
+    for seed in range(5):
+        trip = generate_trip(2_000, seed=seed)
+        assert telemetry.compute_trip_stats(trip) == serial_reference(trip)
+
+
+def test_windowed_matches_serial():
+    trip = generate_trip(5_000, seed=42)
+    expected = serial_reference(trip)
+    for n_windows in (1, 2, 3, 7, 64, 5_000):
+        agg = merge_windows(trip, n_windows)
+        assert telemetry.compute_trip_stats(trip, agg) == expected, n_windows
+
+
+def test_window_boundary_peaks():
+    # Every step is a peak, so any boundary that drops or repeats a delta shows up.
+    start = datetime(2024, 3, 20)
+    trip = [{"trip_id": "t", "timestamp": start + timedelta(seconds=i),
+             "rpm": 1000 + 2000 * (i % 2), "speed": 50.0,
+             "fuel_consumption": 5.0, "engine_temp": 90.0} for i in range(100)]
+    for n_windows in (2, 10, 99):
+        agg = merge_windows(trip, n_windows)
+        assert len(agg.peaks["rpm"]) == 99
+        assert telemetry.compute_trip_stats(trip, agg) == serial_reference(trip)
+
+
+def test_process_pool_matches_serial():
+    trip = generate_trip(20_000, seed=7)
+    workers = telemetry.WORKERS
+    telemetry.WORKERS = 3
+    try:
+        agg = telemetry.aggregate_trip(trip, parallel=True)
+    finally:
+        telemetry.WORKERS = workers
+        telemetry.shutdown_pool()
+    assert telemetry.compute_trip_stats(trip, agg) == serial_reference(trip)
+
+
+def test_non_finite_readings():
+    # NaN and ±inf propagate like statistics.mean, and a NaN reading is not
+    # taken for a missing one on the way through the pool.
+    trip = generate_trip(3_000, seed=3)
+    trip[10]["speed"] = math.nan
+    trip[1_500]["engine_temp"] = math.inf
+    trip[2_000]["fuel_consumption"] = math.inf
+    trip[2_700]["fuel_consumption"] = -math.inf
+    expected = repr(serial_reference(trip))
+    assert "nan" in expected and "inf" in expected
+    assert repr(telemetry.compute_trip_stats(trip)) == expected
+    for n_windows in (2, 7, 3_000):
+        assert repr(telemetry.compute_trip_stats(trip, merge_windows(trip, n_windows))) == expected, n_windows
+
+    assert telemetry._unpack(telemetry._pack([1.5, math.nan, None]))[2] is None
+    assert math.isnan(telemetry._unpack(telemetry._pack([1.5, math.nan, None]))[1])
+
+    workers = telemetry.WORKERS
+    telemetry.WORKERS = 2
+    try:
+        agg = telemetry.aggregate_trip(trip, parallel=True)
+    finally:
+        telemetry.WORKERS = workers
+        telemetry.shutdown_pool()
+    assert repr(telemetry.compute_trip_stats(trip, agg)) == expected
+
+
+def main():
+    print("=== Starting Trip Statistics Tests ===")
+    for test in (test_serial_matches_reference, test_windowed_matches_serial,
+                 test_window_boundary_peaks, test_process_pool_matches_serial,
+                 test_non_finite_readings):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            print(f"❌ {test.__name__}: {e}")
+    print("\n=== Tests Completed ===")
+
+
+if __name__ == "__main__":
+    main()